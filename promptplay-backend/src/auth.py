@@ -1,8 +1,10 @@
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +14,9 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Build the key object once instead of on every encode/decode
+_signing_key = jwk.construct(SECRET_KEY, ALGORITHM)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -33,14 +38,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _signing_key, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[dict]:
-    """Decode a JWT access token."""
+@lru_cache(maxsize=4096)
+def _decode_cached(token: str) -> Optional[dict]:
+    """Verify and decode a JWT once per distinct token string."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, _signing_key, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Decode a JWT access token."""
+    payload = _decode_cached(token)
+    if payload is None:
+        return None
+    
+    # Cached payloads outlive the verification, so re-check expiry on every use
+    exp = payload.get("exp")
+    if exp is not None and exp < time.time():
+        return None
+    
+    return dict(payload)
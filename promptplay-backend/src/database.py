@@ -1,15 +1,54 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import create_engine, event, Index, Column, Integer, String, DateTime, ForeignKey, Boolean, Text
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session, AsyncSession
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime
+import asyncio
+import os
 
-# Database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./promptplay.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database setup (async engine used by the API)
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./promptplay.db"
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,  # aiosqlite defaults to NullPool (new connection per request)
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_recycle=3600,
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False}
+)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# One session per asyncio task, so all code handling a request shares it without passing it around
+ScopedSession = async_scoped_session(SessionLocal, scopefunc=asyncio.current_task)
+
+# Sync engine for maintenance scripts (reset_db.py)
+SYNC_DATABASE_URL = "sqlite:///./promptplay.db"
+sync_engine = create_engine(SYNC_DATABASE_URL, connect_args={"check_same_thread": False})
+SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 Base = declarative_base()
 
 
+# SQLite tuning: WAL lets readers run alongside a writer, NORMAL sync skips most fsyncs,
+# and temp tables, a 256MB memory map and a 64MB page cache keep reads off the disk
+@event.listens_for(engine.sync_engine, "connect")
+@event.listens_for(sync_engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
+
+# In debug builds, lazy loads of game relationships raise so N+1 queries surface early
+GAME_RELATIONSHIP_LAZY = "raise" if os.getenv("PROMPTPLAY_DEBUG", "false").lower() == "true" else "select"
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -27,6 +66,10 @@ class User(Base):
 
 class GameRequest(Base):
     __tablename__ = "game_requests"
+    __table_args__ = (
+        Index("ix_game_status_created", "status", "created_at"),
+        Index("ix_game_host", "host_id"),
+    )
     
     id = Column(String, primary_key=True, index=True)  # UUID
     host_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -39,12 +82,16 @@ class GameRequest(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    host = relationship("User", back_populates="posted_games", foreign_keys=[host_id])
-    join_requests = relationship("JoinRequest", back_populates="game")
+    host = relationship("User", back_populates="posted_games", foreign_keys=[host_id], lazy=GAME_RELATIONSHIP_LAZY)
+    join_requests = relationship("JoinRequest", back_populates="game", lazy=GAME_RELATIONSHIP_LAZY)
 
 
 class JoinRequest(Base):
     __tablename__ = "join_requests"
+    __table_args__ = (
+        Index("ix_join_game_status", "game_id", "status"),
+        Index("ix_join_user_status", "user_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     game_id = Column(String, ForeignKey("game_requests.id"), nullable=False)
@@ -59,15 +106,24 @@ class JoinRequest(Base):
     user = relationship("User", back_populates="join_requests")
 
 
+# Create indexes added after a table was first created (create_all skips existing tables)
+def create_missing_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
 # Create all tables
-def init_db():
-    Base.metadata.create_all(bind=engine)
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
 
 
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    db = ScopedSession()
     try:
         yield db
     finally:
-        db.close()
+        await ScopedSession.remove()
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import json
+import time
+
+
+class LLMCache:
+    """In-memory TTL + LRU cache for LLM completions."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, max_temperature: float = 0.3):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def cache_key(self, model: str, messages: list[dict], temperature: float, allow_high_temperature: bool = False) -> Optional[str]:
+        """Build a cache key for a completion request, or None if it should not be cached."""
+        # High temperature calls are expected to vary, so only cache them when the caller opts in
+        if temperature > self.max_temperature and not allow_high_temperature:
+            return None
+
+        # Normalize case and whitespace so trivially different prompts share an entry
+        normalized = [
+            {"role": m["role"], "content": " ".join(m["content"].lower().split())}
+            for m in messages
+        ]
+        payload = {"model": model, "messages": normalized, "temperature": temperature}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Return a cached completion, or None on a miss or expired entry."""
+        if key is None:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Optional[str], value: str) -> None:
+        """Store a completion, evicting the least recently used entry when full."""
+        if key is None:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached completions."""
+        self._entries.clear()
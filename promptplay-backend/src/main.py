@@ -1,24 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from datetime import datetime
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from sqlalchemy import exists, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, selectinload
+import asyncio
+import httpx
+import time
 import uuid
 import os
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq
 import json
 
 # Import database and auth
 from database import get_db, init_db, User, GameRequest as DBGameRequest, JoinRequest as DBJoinRequest
 from auth import create_access_token, decode_access_token, get_password_hash, verify_password
+from llm_cache import LLMCache
 
 # Load env var
 load_dotenv()
 
 # Initialize fastAPI
-app = FastAPI(title="PromptPlay API")
+app = FastAPI(title="PromptPlay API", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,13 +37,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Cap concurrent LLM calls to stay within Groq rate limits
+LLM_MAX_CONCURRENCY = 16
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
 
-# Initialize database on startup
+# Cache LLM completions so repeated prompts skip the Groq round trip
+LLM_MODEL = "openai/gpt-oss-120b"  # Using a good model for reasoning
+llm_cache = LLMCache(maxsize=1024, ttl=3600)
+
+# System prompts are static so providers can reuse their cached prompt prefix;
+# anything request-specific is appended at the end of the messages
+_CREATE_SYSTEM_PROMPT = """You are an assistant that converts natural language requests into structured JSON.
+Extract the following information from the user's prompt:
+- sport (e.g., "tennis", "football", "basketball")
+- location (e.g., "The Meadows, Edinburgh", "Holyrood Park")
+- datetime_utc (convert relative terms like "tomorrow", "this Wednesday 4pm" to ISO format datetime, using the current date given at the end)
+- players_needed (if they say "for 2 people", they need 1 more player. If they say "need 3 players", then players_needed is 3)
+
+Respond ONLY with valid JSON in this exact format:
+{
+    "sport": "string",
+    "location": "string", 
+    "datetime_utc": "ISO datetime string",
+    "players_needed": number
+}
+
+Do not include any explanation or markdown formatting."""
+
+# Only the date varies between extraction calls, so it is filled into a precompiled suffix
+_CREATE_SYSTEM_TMPL = _CREATE_SYSTEM_PROMPT + "\n\nToday is %s"
+
+_MATCH_SYSTEM_PROMPT = """You are a matching assistant that determines if a new game request is compatible with each of several existing posts.
+Consider factors like:
+- Same or compatible sport
+- Similar location (nearby areas are OK)
+- Compatible timing (similar dates/times, allow some flexibility)
+- Overall intent and context
+
+Respond ONLY with a valid JSON array containing one object per existing post, in this exact format:
+[
+    {
+        "game_id": "the post's game_id",
+        "is_match": true or false,
+        "compatibility_score": number from 0-100,
+        "reason": "brief explanation"
+    }
+]
+
+Do not include any explanation or markdown formatting."""
+
+# Number of open games scored per matching LLM call
+MATCH_BATCH_SIZE = 10
+
+# Health check stats are cached briefly so frequent monitoring polls don't hit the DB
+STATS_CACHE_SECONDS = 5
+stats_cache: dict = {}
+
+# Guest usernames are generated, so retry a few times on the (unlikely) collision
+GUEST_USERNAME_ATTEMPTS = 3
+
+# Initialize database and the shared Groq client on startup
 @app.on_event("startup")
-def startup_event():
-    init_db()
+async def startup_event():
+    await init_db()
+    
+    # One Groq client for the app's lifetime keeps TLS connections alive between LLM calls
+    app.state.groq = AsyncGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        http_client=httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await app.state.groq.close()
 
 
 # Pydantic Models for API
@@ -124,9 +202,9 @@ class ValidationError(BaseModel):
     suggestions: str
 
 
-# Helper function to get current user from token
-def get_current_user(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)) -> User:
-    """Get the current authenticated user from the authorization header."""
+# Helper function to get the token payload from the authorization header
+def get_token_payload(authorization: Optional[str]) -> dict:
+    """Decode the bearer token, raising 401 if it is missing or invalid."""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
@@ -136,42 +214,246 @@ def get_current_user(authorization: Optional[str] = Header(None), db: Session =
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user_id = payload.get("user_id")
-    if not user_id:
+    if not payload.get("user_id"):
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    return payload
+
+
+# Helper function to get current user from token
+async def get_current_user(request: Request, authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)) -> User:
+    """Get the current authenticated user from the authorization header."""
+    # Reuse the user already loaded for this request
+    if hasattr(request.state, "current_user"):
+        return request.state.current_user
+    
+    payload = get_token_payload(authorization)
+    
+    user = await db.get(User, payload["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    request.state.current_user = user
     return user
 
 
+# Lightweight auth for read-only endpoints - trusts the token instead of loading the user
+def get_current_user_light(authorization: Optional[str] = Header(None)) -> User:
+    """Build a detached User with only id and username from the token, without a DB query."""
+    payload = get_token_payload(authorization)
+    
+    if not payload.get("username"):
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return User(id=payload["user_id"], username=payload["username"])
+
+
 # Optional auth - returns None if not authenticated
-def get_current_user_optional(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)) -> Optional[User]:
+async def get_current_user_optional(request: Request, authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)) -> Optional[User]:
     """Get the current user if authenticated, otherwise return None."""
     try:
-        return get_current_user(authorization, db)
+        return await get_current_user(request, authorization, db)
     except HTTPException:
         return None
 
 
+# Helper function to count accepted players for a batch of games
+async def get_accepted_counts(db: AsyncSession, game_ids: List[str]) -> dict:
+    """Return a {game_id: accepted_count} mapping using a single GROUP BY query."""
+    if not game_ids:
+        return {}
+    
+    result = await db.execute(
+        select(DBJoinRequest.game_id, func.count(DBJoinRequest.id)).where(
+            DBJoinRequest.status == "accepted",
+            DBJoinRequest.game_id.in_(game_ids)
+        ).group_by(DBJoinRequest.game_id)
+    )
+    return dict(result.all())
+
+
+# Helper function to select game request response fields as plain rows
+def select_game_request_rows():
+    """Select GameRequest response columns with the host's username and a correlated accepted-players count."""
+    players_joined = select(func.count(DBJoinRequest.id)).where(
+        DBJoinRequest.game_id == DBGameRequest.id,
+        DBJoinRequest.status == "accepted"
+    ).correlate(DBGameRequest).scalar_subquery()
+    
+    return select(
+        DBGameRequest.id,
+        DBGameRequest.host_id,
+        User.username.label("host_username"),
+        DBGameRequest.original_prompt,
+        DBGameRequest.sport,
+        DBGameRequest.location,
+        DBGameRequest.datetime_utc,
+        DBGameRequest.players_needed,
+        players_joined.label("players_joined"),
+        DBGameRequest.status,
+        DBGameRequest.created_at
+    ).join(User, User.id == DBGameRequest.host_id)
+
+
 # Helper function to call LLM
-def call_llm(system_message: str, user_message: str, temperature: float = 0.7) -> str:
-    """Call Groq LLM and return the response."""
+async def call_llm(
+    system_message: str,
+    user_message: str,
+    temperature: float = 0.7,
+    max_tokens: int = 1024,
+    cache_if: Optional[Callable[[str], bool]] = None,
+    cache_high_temperature: bool = False
+) -> str:
+    """Call Groq LLM and return the response.
+    
+    Responses are only cached when `cache_if` is given and accepts them, so a malformed
+    completion is never replayed from the cache.
+    """
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": user_message}
+    ]
+    
+    cache_key = None
+    if cache_if is not None:
+        cache_key = llm_cache.cache_key(LLM_MODEL, messages, temperature, allow_high_temperature=cache_high_temperature)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        completion = client.chat.completions.create(
-            model="openai/gpt-oss-120b",  # Using a good model for reasoning
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=temperature,
-            max_tokens=1024,
-        )
-        return completion.choices[0].message.content
+        async with llm_semaphore:
+            completion = await app.state.groq.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM API error: {str(e)}")
+    
+    content = completion.choices[0].message.content
+    if cache_key is not None and cache_if(content):
+        llm_cache.set(cache_key, content)
+    return content
+
+
+# Cache validators: only responses the callers can actually use are worth replaying
+def is_json_object(content: str) -> bool:
+    """Return whether the content parses as a JSON object."""
+    try:
+        return isinstance(json.loads(content), dict)
+    except (json.JSONDecodeError, TypeError):
+        return False
+
+
+def is_json_match_list(content: str) -> bool:
+    """Return whether the content parses as a JSON array of objects or a single object."""
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return False
+    if isinstance(data, dict):
+        return True
+    return isinstance(data, list) and all(isinstance(item, dict) for item in data)
+
+
+# Helper function to extract structured game details from a prompt
+async def extract_game_details(prompt: str) -> str:
+    """Ask the LLM for sport, location, datetime_utc and players_needed as a JSON string."""
+    # Minute precision is enough to resolve "today 4pm", and lets repeated prompts share a cache entry
+    current_date = datetime.now().strftime("%Y-%m-%d %H:%M")
+    system_message = _CREATE_SYSTEM_TMPL % current_date
+    
+    return await call_llm(system_message, prompt, temperature=0.3, cache_if=is_json_object)
+
+
+# Helper function to match a prompt against a batch of game requests
+async def match_game_requests(prompt: str, game_reqs: List[GameRequest]) -> List[MatchResult]:
+    """Ask the LLM to score every game request in one call; returns only the matches."""
+    posts = "\n\n".join(
+        f"""game_id: {game_req.id}
+Existing post: "{game_req.original_prompt}"
+Sport: {game_req.sport}
+Location: {game_req.location}
+Time: {game_req.datetime_utc}
+Players needed: {game_req.players_needed}"""
+        for game_req in game_reqs
+    )
+    user_message = f"""New request: "{prompt}"
+
+{posts}
+
+Which of these posts are a good match?"""
+
+    # Scale the token budget with the batch, since each post gets its own result
+    # Batch prompts carry no date, so repeated searches over the same games are worth caching
+    llm_response = await call_llm(
+        _MATCH_SYSTEM_PROMPT,
+        user_message,
+        temperature=0.5,
+        max_tokens=1024 * len(game_reqs),
+        cache_if=is_json_match_list,
+        cache_high_temperature=True
+    )
+    
+    try:
+        match_data = json.loads(llm_response)
+    except json.JSONDecodeError:
+        # Skip this batch if LLM response is malformed
+        return []
+    
+    if isinstance(match_data, dict):
+        match_data = [match_data]
+    if not isinstance(match_data, list):
+        return []
+    
+    games_by_id = {game_req.id: game_req for game_req in game_reqs}
+    matches = []
+    for item in match_data:
+        # Skip malformed entries and ids the model made up
+        if not isinstance(item, dict) or item.get("game_id") not in games_by_id:
+            continue
+        if not item.get("is_match", False):
+            continue
+        
+        # An entry with missing keys or bad values only costs that entry, not the batch
+        try:
+            match = MatchResult(
+                game_request=games_by_id[item["game_id"]],
+                is_match=item["is_match"],
+                compatibility_score=item["compatibility_score"],
+                reason=item["reason"]
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+        
+        # The model sometimes repeats a game_id; each game matches at most once
+        del games_by_id[item["game_id"]]
+        matches.append(match)
+    
+    return matches
+
+
+# Helper function to turn extracted game details into SQL filters for matching
+def build_match_filters(data: dict) -> list:
+    """Build filters on sport and a +/- 1 day window for whichever details were extracted."""
+    filters = []
+    
+    sport = data.get("sport")
+    if isinstance(sport, str) and sport not in ("", "unknown", "null"):
+        filters.append(func.lower(DBGameRequest.sport) == sport.lower())
+    
+    datetime_utc = data.get("datetime_utc")
+    if isinstance(datetime_utc, str) and datetime_utc not in ("", "unknown", "null"):
+        try:
+            # Stored datetimes are naive, so compare against a naive value
+            when = datetime.fromisoformat(datetime_utc.replace("Z", "+00:00")).replace(tzinfo=None)
+            filters.append(DBGameRequest.datetime_utc.between(when - timedelta(days=1), when + timedelta(days=1)))
+        except ValueError:
+            pass
+    
+    return filters
 
 
 # Helper function to validate extracted data
@@ -211,23 +493,24 @@ def validate_game_request(data: dict) -> tuple[bool, list[str], str]:
 # ========== Authentication Endpoints ==========
 
 @app.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user or create a guest account."""
     # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
+    username_taken = await db.scalar(select(exists().where(User.username == user_data.username)))
+    if username_taken:
         raise HTTPException(status_code=400, detail="Username already exists")
     
     # Check if email already exists (if provided)
     if user_data.email:
-        existing_email = db.query(User).filter(User.email == user_data.email).first()
-        if existing_email:
+        email_taken = await db.scalar(select(exists().where(User.email == user_data.email)))
+        if email_taken:
             raise HTTPException(status_code=400, detail="Email already exists")
     
     # Create new user
     hashed_password = None
     if not user_data.is_guest and user_data.password:
-        hashed_password = get_password_hash(user_data.password)
+        # bcrypt is CPU-bound, so hash in a worker thread to keep the event loop free
+        hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     
     new_user = User(
         username=user_data.username,
@@ -237,8 +520,8 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(data={"user_id": new_user.id, "username": new_user.username})
@@ -251,9 +534,9 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login with username and password."""
-    user = db.query(User).filter(User.username == credentials.username).first()
+    user = await db.scalar(select(User).where(User.username == credentials.username))
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
@@ -261,7 +544,12 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     if user.is_guest:
         raise HTTPException(status_code=401, detail="Guest users cannot login with password")
     
-    if not user.hashed_password or not verify_password(credentials.password, user.hashed_password):
+    if not user.hashed_password:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    
+    # bcrypt is CPU-bound, so verify in a worker thread to keep the event loop free
+    password_ok = await asyncio.to_thread(verify_password, credentials.password, user.hashed_password)
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     # Create access token
@@ -275,27 +563,26 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/guest", response_model=TokenResponse)
-async def login_as_guest(db: Session = Depends(get_db)):
+async def login_as_guest(db: AsyncSession = Depends(get_db)):
     """Quick login as a guest with auto-generated username."""
-    # Generate unique guest username
-    import random
-    guest_number = random.randint(1000, 9999)
-    username = f"Guest{guest_number}"
-    
-    # Ensure uniqueness
-    while db.query(User).filter(User.username == username).first():
-        guest_number = random.randint(1000, 9999)
-        username = f"Guest{guest_number}"
-    
-    # Create guest user
-    new_user = User(
-        username=username,
-        is_guest=True
-    )
+    # A random UUID suffix makes collisions negligible, so insert directly and
+    # let the unique constraint catch the rare clash instead of pre-checking
+    for _ in range(GUEST_USERNAME_ATTEMPTS):
+        new_user = User(
+            username=f"Guest{uuid.uuid4().hex[:8]}",
+            is_guest=True
+        )
+        
+        db.add(new_user)
+        try:
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+    else:
+        raise HTTPException(status_code=500, detail="Could not generate a unique guest username")
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(data={"user_id": new_user.id, "username": new_user.username})
@@ -316,77 +603,50 @@ async def get_me(current_user: User = Depends(get_current_user)):
 # ========== Game Request Endpoints ==========
 
 @app.get("/")
-async def root(db: Session = Depends(get_db)):
-    total_requests = db.query(DBGameRequest).count()
-    total_users = db.query(User).count()
+async def root(db: AsyncSession = Depends(get_db)):
+    bucket = int(time.time() // STATS_CACHE_SECONDS)
+    if stats_cache.get("bucket") != bucket:
+        # Both counts in a single statement
+        result = await db.execute(
+            select(
+                select(func.count()).select_from(DBGameRequest).scalar_subquery(),
+                select(func.count()).select_from(User).scalar_subquery()
+            )
+        )
+        total_requests, total_users = result.one()
+        stats_cache.update(bucket=bucket, total_requests=total_requests, total_users=total_users)
+    
     return {
         "message": "PromptPlay API is running",
-        "total_requests": total_requests,
-        "total_users": total_users
+        "total_requests": stats_cache["total_requests"],
+        "total_users": stats_cache["total_users"]
     }
 
 
 @app.get("/requests", response_model=List[GameRequest])
-async def get_all_requests(db: Session = Depends(get_db)):
+async def get_all_requests(db: AsyncSession = Depends(get_db)):
     """Get all game requests."""
-    db_requests = db.query(DBGameRequest).order_by(DBGameRequest.created_at.desc()).all()
-    
-    # Convert to response model with additional fields
-    requests = []
-    for req in db_requests:
-        join_count = db.query(DBJoinRequest).filter(
-            DBJoinRequest.game_id == req.id,
-            DBJoinRequest.status == "accepted"
-        ).count()
-        
-        requests.append(GameRequest(
-            id=req.id,
-            host_id=req.host_id,
-            host_username=req.host.username,
-            original_prompt=req.original_prompt,
-            sport=req.sport,
-            location=req.location,
-            datetime_utc=req.datetime_utc,
-            players_needed=req.players_needed,
-            players_joined=join_count,
-            status=req.status,
-            created_at=req.created_at
-        ))
+    # Rows already hold every response field, so no ORM objects are built
+    result = await db.execute(
+        select_game_request_rows().order_by(DBGameRequest.created_at.desc())
+    )
     
-    return requests
+    # Build response dicts directly; response_model is kept for the API docs only
+    return ORJSONResponse(content=[dict(row._mapping) for row in result])
 
 
 @app.post("/create-request", response_model=GameRequest)
 async def create_request(
     prompt_req: PromptRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     LLM Use Case 1: Extract structured data from natural language prompt.
     Requires authentication.
     """
-    current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    system_message = f"""You are an assistant that converts natural language requests into structured JSON.
-Extract the following information from the user's prompt:
-- sport (e.g., "tennis", "football", "basketball")
-- location (e.g., "The Meadows, Edinburgh", "Holyrood Park")
-- datetime_utc (convert relative terms like "tomorrow", "this Wednesday 4pm" to ISO format datetime. Today is {current_date})
-- players_needed (if they say "for 2 people", they need 1 more player. If they say "need 3 players", then players_needed is 3)
-
-Respond ONLY with valid JSON in this exact format:
-{{
-    "sport": "string",
-    "location": "string", 
-    "datetime_utc": "ISO datetime string",
-    "players_needed": number
-}}
-
-Do not include any explanation or markdown formatting."""
-
     # Call LLM to extract structured data
-    llm_response = call_llm(system_message, prompt_req.prompt, temperature=0.3)
+    llm_response = await extract_game_details(prompt_req.prompt)
     
     try:
         # Parse LLM response
@@ -419,8 +679,8 @@ Do not include any explanation or markdown formatting."""
         )
         
         db.add(db_game_request)
-        db.commit()
-        db.refresh(db_game_request)
+        await db.commit()
+        await db.refresh(db_game_request)
         
         # Return response model
         return GameRequest(
@@ -446,86 +706,52 @@ Do not include any explanation or markdown formatting."""
 
 
 @app.post("/find-match", response_model=List[MatchResult])
-async def find_match(prompt_req: PromptRequest, db: Session = Depends(get_db)):
+async def find_match(prompt_req: PromptRequest, db: AsyncSession = Depends(get_db)):
     """
     LLM Use Case 2: Semantically match a prompt against all open game requests.
     """
-    # Get all open requests from database
-    db_open_requests = db.query(DBGameRequest).filter(DBGameRequest.status == "open").all()
+    # Extract the prompt's sport and time once, so only plausible games reach the matching LLM
+    try:
+        extracted_data = json.loads(await extract_game_details(prompt_req.prompt))
+    except (json.JSONDecodeError, HTTPException):
+        # Fall back to matching against every open game
+        extracted_data = {}
+    
+    filters = build_match_filters(extracted_data) if isinstance(extracted_data, dict) else []
+    
+    # Get candidate open requests from database
+    result = await db.execute(
+        select_game_request_rows().where(DBGameRequest.status == "open", *filters)
+    )
+    
+    # Rows come straight from the database, so skip re-validating them
+    game_reqs = [GameRequest.model_construct(**row._mapping) for row in result]
     
-    if not db_open_requests:
+    if not game_reqs:
         return []
     
-    matches = []
+    # Call LLM for semantic matching, one call per batch of games, all batches concurrently
+    batches = [game_reqs[i:i + MATCH_BATCH_SIZE] for i in range(0, len(game_reqs), MATCH_BATCH_SIZE)]
+    results = await asyncio.gather(
+        *(match_game_requests(prompt_req.prompt, batch) for batch in batches),
+        return_exceptions=True
+    )
     
-    for db_game_req in db_open_requests:
-        # Count accepted players
-        join_count = db.query(DBJoinRequest).filter(
-            DBJoinRequest.game_id == db_game_req.id,
-            DBJoinRequest.status == "accepted"
-        ).count()
-        
-        # Convert to response model
-        game_req = GameRequest(
-            id=db_game_req.id,
-            host_id=db_game_req.host_id,
-            host_username=db_game_req.host.username,
-            original_prompt=db_game_req.original_prompt,
-            sport=db_game_req.sport,
-            location=db_game_req.location,
-            datetime_utc=db_game_req.datetime_utc,
-            players_needed=db_game_req.players_needed,
-            players_joined=join_count,
-            status=db_game_req.status,
-            created_at=db_game_req.created_at
-        )
-        system_message = """You are a matching assistant that determines if two game requests are compatible.
-Consider factors like:
-- Same or compatible sport
-- Similar location (nearby areas are OK)
-- Compatible timing (similar dates/times, allow some flexibility)
-- Overall intent and context
-
-Respond ONLY with valid JSON in this exact format:
-{
-    "is_match": true or false,
-    "compatibility_score": number from 0-100,
-    "reason": "brief explanation"
-}
-
-Do not include any explanation or markdown formatting."""
-
-        user_message = f"""New request: "{prompt_req.prompt}"
-
-Existing post: "{game_req.original_prompt}"
-Sport: {game_req.sport}
-Location: {game_req.location}
-Time: {game_req.datetime_utc}
-Players needed: {game_req.players_needed}
-
-Are these a good match?"""
-
-        # Call LLM for semantic matching
-        llm_response = call_llm(system_message, user_message, temperature=0.5)
-        
-        try:
-            match_data = json.loads(llm_response)
-            
-            if match_data.get("is_match", False):
-                matches.append(MatchResult(
-                    game_request=game_req,
-                    is_match=match_data["is_match"],
-                    compatibility_score=match_data["compatibility_score"],
-                    reason=match_data["reason"]
-                ))
-        except json.JSONDecodeError:
-            # Skip this match if LLM response is malformed
-            continue
+    # Only fail the request if every LLM call failed
+    errors = [r for r in results if isinstance(r, Exception)]
+    if len(errors) == len(results):
+        if isinstance(errors[0], HTTPException):
+            raise errors[0]
+        raise HTTPException(status_code=500, detail=f"Error matching requests: {str(errors[0])}")
+    
+    # Skip batches that failed
+    matches = [match for r in results if not isinstance(r, Exception) for match in r]
     
     # Sort by compatibility score (highest first)
     matches.sort(key=lambda x: x.compatibility_score, reverse=True)
     
-    return matches
+    # Matches are already validated models, so skip FastAPI re-validating them
+    return ORJSONResponse(content=[match.model_dump() for match in matches])
 
 
 # ========== Join Request Endpoints ==========
@@ -535,13 +761,23 @@ async def join_game(
     game_id: str,
     join_data: JoinRequestCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Request to join a game."""
+    # Load the game and whether the user already requested to join in one query
+    already_requested = select(DBJoinRequest.id).where(
+        DBJoinRequest.game_id == DBGameRequest.id,
+        DBJoinRequest.user_id == current_user.id
+    ).exists()
+    result = await db.execute(
+        select(DBGameRequest, already_requested).where(DBGameRequest.id == game_id)
+    )
+    row = result.first()
+    
     # Check if game exists
-    game = db.query(DBGameRequest).filter(DBGameRequest.id == game_id).first()
-    if not game:
+    if not row:
         raise HTTPException(status_code=404, detail="Game not found")
+    game, existing_request = row
     
     if game.status != "open":
         raise HTTPException(status_code=400, detail="Game is not open for joining")
@@ -550,11 +786,6 @@ async def join_game(
         raise HTTPException(status_code=400, detail="You cannot join your own game")
     
     # Check if already requested
-    existing_request = db.query(DBJoinRequest).filter(
-        DBJoinRequest.game_id == game_id,
-        DBJoinRequest.user_id == current_user.id
-    ).first()
-    
     if existing_request:
         raise HTTPException(status_code=400, detail="You have already requested to join this game")
     
@@ -567,8 +798,8 @@ async def join_game(
     )
     
     db.add(join_request)
-    db.commit()
-    db.refresh(join_request)
+    await db.commit()
+    await db.refresh(join_request)
     
     return JoinRequestResponse(
         id=join_request.id,
@@ -584,18 +815,23 @@ async def join_game(
 @app.get("/games/{game_id}/join-requests", response_model=List[JoinRequestResponse])
 async def get_join_requests(
     game_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_light),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all join requests for a game (only host can see)."""
-    game = db.query(DBGameRequest).filter(DBGameRequest.id == game_id).first()
+    game = await db.get(DBGameRequest, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
     if game.host_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the host can view join requests")
     
-    join_requests = db.query(DBJoinRequest).filter(DBJoinRequest.game_id == game_id).all()
+    result = await db.execute(
+        select(DBJoinRequest).options(
+            selectinload(DBJoinRequest.user)
+        ).where(DBJoinRequest.game_id == game_id)
+    )
+    join_requests = result.scalars().all()
     
     return [
         JoinRequestResponse(
@@ -616,14 +852,27 @@ async def update_join_request(
     request_id: int,
     update_data: JoinRequestUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Accept or reject a join request (only host can do this)."""
-    join_request = db.query(DBJoinRequest).filter(DBJoinRequest.id == request_id).first()
-    if not join_request:
+    # Load the join request, its user, its game and the game's accepted count in one query
+    accepted_joins = aliased(DBJoinRequest)
+    accepted_count = select(func.count(accepted_joins.id)).where(
+        accepted_joins.game_id == DBGameRequest.id,
+        accepted_joins.status == "accepted"
+    ).correlate(DBGameRequest).scalar_subquery()
+    result = await db.execute(
+        select(DBJoinRequest, DBGameRequest, accepted_count).outerjoin(
+            DBGameRequest, DBGameRequest.id == DBJoinRequest.game_id
+        ).options(
+            joinedload(DBJoinRequest.user)
+        ).where(DBJoinRequest.id == request_id)
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Join request not found")
+    join_request, game, accepted_count = row
     
-    game = db.query(DBGameRequest).filter(DBGameRequest.id == join_request.game_id).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
@@ -633,20 +882,16 @@ async def update_join_request(
     if update_data.status not in ["accepted", "rejected"]:
         raise HTTPException(status_code=400, detail="Status must be 'accepted' or 'rejected'")
     
-    join_request.status = update_data.status
-    db.commit()
-    db.refresh(join_request)
-    
-    # Check if game is full
+    # Check if game is full, counting this request if it is newly accepted
     if update_data.status == "accepted":
-        accepted_count = db.query(DBJoinRequest).filter(
-            DBJoinRequest.game_id == game.id,
-            DBJoinRequest.status == "accepted"
-        ).count()
+        if join_request.status != "accepted":
+            accepted_count += 1
         
         if accepted_count >= game.players_needed:
             game.status = "full"
-            db.commit()
+    
+    join_request.status = update_data.status
+    await db.commit()
     
     return JoinRequestResponse(
         id=join_request.id,
@@ -663,20 +908,22 @@ async def update_join_request(
 
 @app.get("/my-games/hosted", response_model=List[GameRequest])
 async def get_my_hosted_games(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_light),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all games hosted by the current user."""
-    hosted_games = db.query(DBGameRequest).filter(
-        DBGameRequest.host_id == current_user.id
-    ).order_by(DBGameRequest.created_at.desc()).all()
+    result = await db.execute(
+        select(DBGameRequest).where(
+            DBGameRequest.host_id == current_user.id
+        ).order_by(DBGameRequest.created_at.desc())
+    )
+    hosted_games = result.scalars().all()
+    
+    counts = await get_accepted_counts(db, [game.id for game in hosted_games])
     
     result = []
     for game in hosted_games:
-        join_count = db.query(DBJoinRequest).filter(
-            DBJoinRequest.game_id == game.id,
-            DBJoinRequest.status == "accepted"
-        ).count()
+        join_count = counts.get(game.id, 0)
         
         result.append(GameRequest(
             id=game.id,
@@ -697,22 +944,26 @@ async def get_my_hosted_games(
 
 @app.get("/my-games/joined", response_model=List[GameRequest])
 async def get_my_joined_games(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_light),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all games the current user has joined (accepted)."""
-    accepted_joins = db.query(DBJoinRequest).filter(
-        DBJoinRequest.user_id == current_user.id,
-        DBJoinRequest.status == "accepted"
-    ).all()
+    result = await db.execute(
+        select(DBJoinRequest).options(
+            selectinload(DBJoinRequest.game).selectinload(DBGameRequest.host)
+        ).where(
+            DBJoinRequest.user_id == current_user.id,
+            DBJoinRequest.status == "accepted"
+        )
+    )
+    accepted_joins = result.scalars().all()
+    
+    counts = await get_accepted_counts(db, [join_req.game_id for join_req in accepted_joins])
     
     result = []
     for join_req in accepted_joins:
         game = join_req.game
-        join_count = db.query(DBJoinRequest).filter(
-            DBJoinRequest.game_id == game.id,
-            DBJoinRequest.status == "accepted"
-        ).count()
+        join_count = counts.get(game.id, 0)
         
         result.append(GameRequest(
             id=game.id,
@@ -732,17 +983,17 @@ async def get_my_joined_games(
 
 
 @app.delete("/requests/{request_id}")
-async def delete_request(request_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_request(request_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Delete a specific game request (only host can delete)."""
-    game = db.query(DBGameRequest).filter(DBGameRequest.id == request_id).first()
+    game = await db.get(DBGameRequest, request_id)
     if not game:
         raise HTTPException(status_code=404, detail="Request not found")
     
     if game.host_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the host can delete this game")
     
-    db.delete(game)
-    db.commit()
+    await db.delete(game)
+    await db.commit()
     return {"message": "Request deleted successfully"}
 
 
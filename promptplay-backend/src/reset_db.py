@@ -3,9 +3,21 @@
 Database reset utility for PromptPlay
 Provides options to clean/reset the database
 """
-import os
 import sys
-from database import engine, Base, SessionLocal, User, GameRequest, JoinRequest
+from pathlib import Path
+from sqlalchemy import select, func
+from database import sync_engine as engine, Base, SyncSessionLocal as SessionLocal, User, GameRequest, JoinRequest
+
+# All three table counts in one round trip; a plain multi-table count would cross join
+STATS_QUERY = select(
+    select(func.count()).select_from(User).scalar_subquery().label("users"),
+    select(func.count()).select_from(GameRequest).scalar_subquery().label("games"),
+    select(func.count()).select_from(JoinRequest).scalar_subquery().label("joins")
+)
+
+def get_counts(db):
+    """Return (user_count, game_count, join_count) from a single query"""
+    return tuple(db.execute(STATS_QUERY).one())
 
 def reset_all():
     """Drop all tables and recreate them (complete reset)"""
@@ -19,119 +31,123 @@ def reset_all():
 
 def clear_all_data():
     """Keep tables but delete all data"""
-    db = SessionLocal()
     try:
         print("Clearing all data...")
         
-        # Delete in order (respecting foreign keys)
-        deleted_join_requests = db.query(JoinRequest).delete()
-        print(f"   Deleted {deleted_join_requests} join requests")
-        
-        deleted_games = db.query(GameRequest).delete()
-        print(f"   Deleted {deleted_games} game requests")
-        
-        deleted_users = db.query(User).delete()
-        print(f"   Deleted {deleted_users} users")
+        # Delete children first so no foreign key is left dangling, as plain bulk DELETEs
+        # in one transaction; nothing is loaded into the session, so skip syncing it
+        with SessionLocal.begin() as db:
+            deleted_join_requests = db.query(JoinRequest).delete(synchronize_session=False)
+            print(f"   Deleted {deleted_join_requests} join requests")
+            
+            deleted_games = db.query(GameRequest).delete(synchronize_session=False)
+            print(f"   Deleted {deleted_games} game requests")
+            
+            deleted_users = db.query(User).delete(synchronize_session=False)
+            print(f"   Deleted {deleted_users} users")
         
-        db.commit()
         print("All data cleared!")
     except Exception as e:
-        db.rollback()
         print(f"Error: {e}")
-    finally:
-        db.close()
 
 def clear_games_only():
     """Clear only game-related data, keep users"""
-    db = SessionLocal()
     try:
         print("Clearing game data...")
         
-        deleted_join_requests = db.query(JoinRequest).delete()
-        print(f"   Deleted {deleted_join_requests} join requests")
+        # Bulk DELETEs in one transaction, without syncing the (empty) session
+        with SessionLocal.begin() as db:
+            deleted_join_requests = db.query(JoinRequest).delete(synchronize_session=False)
+            print(f"   Deleted {deleted_join_requests} join requests")
+            
+            deleted_games = db.query(GameRequest).delete(synchronize_session=False)
+            print(f"   Deleted {deleted_games} game requests")
         
-        deleted_games = db.query(GameRequest).delete()
-        print(f"   Deleted {deleted_games} game requests")
-        
-        db.commit()
         print("Game data cleared! Users preserved.")
     except Exception as e:
-        db.rollback()
         print(f"Error: {e}")
-    finally:
-        db.close()
 
-def show_stats():
-    """Show current database statistics"""
-    db = SessionLocal()
-    try:
-        user_count = db.query(User).count()
-        game_count = db.query(GameRequest).count()
-        join_count = db.query(JoinRequest).count()
+def format_count(count, before=None):
+    """Format a count, with its change since `before` when given"""
+    if before is None or count == before:
+        return f"{count}"
+    return f"{count} ({count - before:+d})"
+
+def show_stats(before=None):
+    """Show current database statistics, as deltas against `before` counts if given"""
+    # Counts and user listing share one connection and one transaction
+    with SessionLocal.begin() as db:
+        counts = get_counts(db)
+        user_count, game_count, join_count = counts
+        before_users, before_games, before_joins = before or (None, None, None)
         
         print("\nDatabase Statistics:")
-        print(f"   Users: {user_count}")
-        print(f"   Game Requests: {game_count}")
-        print(f"   Join Requests: {join_count}")
+        print(f"   Users: {format_count(user_count, before_users)}")
+        print(f"   Game Requests: {format_count(game_count, before_games)}")
+        print(f"   Join Requests: {format_count(join_count, before_joins)}")
         
-        if user_count > 0:
+        # After an operation, only list users again if the user count changed
+        if user_count > 0 and user_count != before_users:
             print("\nUsers:")
-            users = db.query(User).all()
-            for user in users:
-                guest_badge = " (Guest)" if user.is_guest else ""
-                print(f"   - {user.username}{guest_badge} (ID: {user.id})")
+            # Plain column rows; no need to hydrate ORM objects just to print them
+            users = db.execute(select(User.id, User.username, User.is_guest)).all()
+            for user_id, username, is_guest in users:
+                guest_badge = " (Guest)" if is_guest else ""
+                print(f"   - {username}{guest_badge} (ID: {user_id})")
         
-    finally:
-        db.close()
+        return counts
 
 def delete_database_file():
-    """Delete the database file completely"""
-    db_path = "./promptplay.db"
-    if os.path.exists(db_path):
-        print(f"Deleting database file: {db_path}")
-        os.remove(db_path)
-        print("Database file deleted!")
-        print("Run the backend to create a fresh database")
-    else:
+    """Delete the database file completely, along with any WAL sidecar files"""
+    db_path = Path("./promptplay.db")
+    deleted = []
+    # Sidecars can outlive the main file (e.g. after a crash); a fresh DB would pick them up
+    for path in (db_path, db_path.with_suffix(".db-wal"), db_path.with_suffix(".db-shm")):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        deleted.append(path)
+        print(f"Deleted: {path}")
+    
+    if not deleted:
         print("Database file not found")
+        return
+    print("Run the backend to create a fresh database")
+
+# command -> (handler, confirmation prompt, show stats afterwards); "stats" only shows them
+COMMANDS = {
+    "stats": (None, None, False),
+    "clear-all": (clear_all_data, "Delete ALL data?", True),
+    "clear-games": (clear_games_only, "Delete all games but keep users?", True),
+    "reset": (reset_all, "RESET entire database (drop & recreate)?", True),
+    "delete-file": (delete_database_file, "DELETE database file completely?", False),
+}
 
 def main():
     print("PromptPlay Database Reset Utility\n")
     
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
-        
-        if command == "stats":
-            show_stats()
-        elif command == "clear-all":
-            show_stats()
-            confirm = input("\nDelete ALL data? (yes/no): ")
-            if confirm.lower() == 'yes':
-                clear_all_data()
-                show_stats()
-        elif command == "clear-games":
-            show_stats()
-            confirm = input("\nDelete all games but keep users? (yes/no): ")
-            if confirm.lower() == 'yes':
-                clear_games_only()
-                show_stats()
-        elif command == "reset":
-            show_stats()
-            confirm = input("\nRESET entire database (drop & recreate)? (yes/no): ")
-            if confirm.lower() == 'yes':
-                reset_all()
-                show_stats()
-        elif command == "delete-file":
-            show_stats()
-            confirm = input("\nDELETE database file completely? (yes/no): ")
-            if confirm.lower() == 'yes':
-                delete_database_file()
-        else:
-            print(f"Unknown command: {command}")
-            print_usage()
-    else:
+    if len(sys.argv) < 2:
         print_usage()
         show_stats()
+        return
+    
+    command = sys.argv[1].lower()
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}")
+        print_usage()
+        return
+    
+    handler, prompt, stats_after = COMMANDS[command]
+    before = show_stats()
+    if handler is None:
+        return
+    
+    confirm = input(f"\n{prompt} (yes/no): ")
+    if confirm.strip().lower() == 'yes':
+        handler()
+        if stats_after:
+            show_stats(before)
 
 def print_usage():
     print("Usage: python reset_db.py [command]")
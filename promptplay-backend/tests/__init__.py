@@ -6,3 +6,6 @@ from pathlib import Path
 # Add src directory to Python path
 src_path = Path(__file__).parent.parent / "src"
 sys.path.insert(0, str(src_path))
+
+# Raise on lazy relationship loads so N+1 query regressions fail the tests
+os.environ.setdefault("PROMPTPLAY_DEBUG", "true")
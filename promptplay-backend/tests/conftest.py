@@ -0,0 +1,11 @@
+"""Shared pytest fixtures for backend tests."""
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def fast_bcrypt():
+    """Hash with the minimum bcrypt cost so password tests don't dominate runtime."""
+    from auth import pwd_context
+
+    pwd_context.update(bcrypt__rounds=4)
+    yield
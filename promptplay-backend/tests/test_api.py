@@ -1,61 +1,214 @@
 """Integration tests for API endpoints."""
+import asyncio
+import json
+import re
+import uuid
+import httpx
 import pytest
+import time_machine
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from database import Base, get_db
+from passlib.context import CryptContext
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from database import Base, get_db, User, GameRequest, JoinRequest
+from auth import get_password_hash, create_access_token
+import main
 from main import app
+from llm_cache import LLMCache
 
-# Create test database
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test_promptplay.db"
-engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create in-memory test database; StaticPool keeps the single connection the database lives on.
+# Each pytest-xdist worker is its own process, so workers never share a database
+SQLALCHEMY_TEST_DATABASE_URL = "sqlite+aiosqlite://"
+engine = create_async_engine(
+    SQLALCHEMY_TEST_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
 
+# Sessions are bound per test to a connection whose transaction is rolled back afterwards;
+# app commits only release a SAVEPOINT inside that transaction
+TestingSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, join_transaction_mode="create_savepoint")
 
-def override_get_db():
+
+# Let SQLAlchemy emit BEGIN itself, otherwise the sqlite driver breaks SAVEPOINT handling
+@event.listens_for(engine.sync_engine, "connect")
+def disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+# Keep the journal and temp tables in memory like the database itself
+@event.listens_for(engine.sync_engine, "connect")
+def set_test_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+async def override_get_db():
     """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides[get_db] = override_get_db
 
 
-@pytest.fixture(scope="function")
-def test_db():
-    """Create test database and tables."""
-    Base.metadata.create_all(bind=engine)
+@pytest.fixture(scope="session")
+def event_loop():
+    """Share one event loop so session-scoped async fixtures can run."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+async def test_schema():
+    """Create test tables once for the whole session."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     yield
-    Base.metadata.drop_all(bind=engine)
+    await engine.dispose()
 
 
-@pytest.fixture
-def client(test_db):
-    """Create test client."""
+@pytest.fixture(scope="function", autouse=True)
+async def test_db(test_schema):
+    """Run each test inside a transaction that is rolled back at teardown."""
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        TestingSessionLocal.configure(bind=connection)
+        yield
+        await transaction.rollback()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def plaintext_passwords():
+    """Skip bcrypt in API tests; hashing itself is covered by test_auth.py."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("auth.pwd_context", CryptContext(schemes=["plaintext"], deprecated="auto"))
+        yield
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Create one test client per module; test_db still isolates each test's data."""
     return TestClient(app)
 
 
+@pytest.fixture(scope="session")
+async def db_lock():
+    """Create the lock on the session loop that async_client requests run on."""
+    return asyncio.Lock()
+
+
 @pytest.fixture
-def auth_headers(client):
-    """Create authenticated user and return auth headers."""
-    # Register a test user
-    response = client.post(
-        "/auth/register",
-        json={
-            "username": "testuser",
-            "email": "test@example.com",
-            "password": "testpass123",
-            "is_guest": False
-        }
-    )
-    assert response.status_code == 200
-    data = response.json()
-    token = data["access_token"]
-    
-    return {"Authorization": f"Bearer {token}"}
+async def async_client(db_lock, monkeypatch):
+    """Create an async client that calls the app in-process on the test loop."""
+    # Requests sent together would interleave SAVEPOINTs on the one test connection,
+    # so each holds the connection for its whole session
+    async def locked_get_db():
+        async with db_lock, TestingSessionLocal() as db:
+            yield db
+    
+    monkeypatch.setitem(app.dependency_overrides, get_db, locked_get_db)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(scope="module")
+async def auth_headers(test_schema):
+    """Create the authenticated test user once per module and return auth headers."""
+    # Committed outside the per-test transactions, so it survives their rollbacks
+    async with TestingSessionLocal(bind=engine) as db:
+        user = User(
+            username="testuser",
+            email="test@example.com",
+            hashed_password=get_password_hash("testpass123"),
+            is_guest=False
+        )
+        db.add(user)
+        await db.commit()
+        token = create_access_token(data={"user_id": user.id, "username": user.username})
+    
+    yield {"Authorization": f"Bearer {token}"}
+    
+    async with TestingSessionLocal(bind=engine) as db:
+        await db.delete(user)
+        await db.commit()
+
+
+@pytest.fixture
+def bulk_register():
+    """Return a helper that inserts user rows in one INSERT ... RETURNING and returns their ids."""
+    async def register(users):
+        async with TestingSessionLocal() as db:
+            user_ids = await db.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                users
+            )
+            user_ids = user_ids.all()
+            await db.commit()
+        return user_ids
+    
+    return register
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    """Stub the Groq client behind call_llm with an empty LLM cache.
+    
+    Returns an installer taking a function from the request's messages to the completion
+    content; it returns the list of messages sent to Groq per call.
+    """
+    groq_calls = []
+    
+    def install(respond):
+        async def fake_create(messages, **kwargs):
+            groq_calls.append(messages)
+            content = respond(messages)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        
+        fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create)))
+        monkeypatch.setattr(app.state, "groq", fake_client, raising=False)
+        monkeypatch.setattr(main, "llm_cache", LLMCache())
+        return groq_calls
+    
+    return install
+
+
+@pytest.fixture
+async def seeded_game(client, auth_headers):
+    """Create a game hosted by the test user with one accepted join request."""
+    async with TestingSessionLocal() as db:
+        host = await db.scalar(select(User).where(User.username == "testuser"))
+        player = User(username="player", is_guest=True)
+        db.add(player)
+        await db.flush()
+        
+        game = GameRequest(
+            id="game-1",
+            host_id=host.id,
+            original_prompt="Tennis at the Meadows tomorrow 4pm",
+            sport="tennis",
+            location="The Meadows",
+            datetime_utc=datetime(2030, 1, 1, 16, 0),
+            players_needed=2,
+            status="open"
+        )
+        db.add(game)
+        db.add(JoinRequest(game_id=game.id, user_id=player.id, status="accepted"))
+        await db.commit()
+        return game.id
 
 
 class TestHealthCheck:
@@ -177,6 +330,19 @@ class TestAuthEndpoints:
         assert data["user"]["is_guest"] is True
         assert data["user"]["username"].startswith("Guest")
     
+    def test_guest_login_retries_on_username_collision(self, client, monkeypatch):
+        """Test that a clashing guest username is retried with a new suffix."""
+        taken = uuid.UUID("12345678" + "0" * 24)
+        fresh = uuid.UUID("abcdef12" + "0" * 24)
+        client.post("/auth/register", json={"username": "Guest12345678", "is_guest": True})
+        
+        suffixes = iter([taken, fresh])
+        monkeypatch.setattr(main.uuid, "uuid4", lambda: next(suffixes))
+        response = client.post("/auth/guest")
+        
+        assert response.status_code == 200
+        assert response.json()["user"]["username"] == "Guestabcdef12"
+    
     def test_get_current_user(self, client, auth_headers):
         """Test getting current user info."""
         response = client.get("/auth/me", headers=auth_headers)
@@ -203,6 +369,69 @@ class TestGameRequestEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
     
+    def test_get_all_requests_with_players(self, client, seeded_game):
+        """Test that listed games include host and accepted player count."""
+        response = client.get("/requests")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["id"] == seeded_game
+        assert data[0]["host_username"] == "testuser"
+        assert data[0]["players_joined"] == 1
+    
+    async def test_get_all_requests_newest_first(self, client, bulk_register):
+        """Test that games from several hosts are listed newest first."""
+        host_ids = await bulk_register([
+            {"username": f"host{i}", "is_guest": True} for i in range(3)
+        ])
+        async with TestingSessionLocal() as db:
+            await db.execute(insert(GameRequest), [
+                {
+                    "id": f"game-{i}",
+                    "host_id": host_id,
+                    "original_prompt": "Football in the park",
+                    "sport": "football",
+                    "location": "The Park",
+                    "datetime_utc": datetime(2030, 1, 1, 16, 0),
+                    "players_needed": 4,
+                    "status": "open",
+                    "created_at": datetime(2030, 1, 1, i)
+                }
+                for i, host_id in enumerate(host_ids)
+            ])
+            await db.commit()
+        
+        response = client.get("/requests")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [game["id"] for game in data] == ["game-2", "game-1", "game-0"]
+        assert [game["host_username"] for game in data] == ["host2", "host1", "host0"]
+    
+    def test_create_request_reuses_cached_extraction(self, client, auth_headers, fake_groq):
+        """Test that repeating a prompt is served from the LLM cache instead of calling Groq again."""
+        groq_calls = fake_groq(lambda messages: json.dumps({
+            "sport": "tennis",
+            "location": "The Meadows",
+            "datetime_utc": "2030-01-01T16:00:00Z",
+            "players_needed": 2
+        }))
+        
+        # The calls are seconds apart but in the same minute, which is all the extraction prompt includes
+        start = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        with time_machine.travel(start, tick=False) as traveller:
+            for _ in range(2):
+                response = client.post(
+                    "/create-request",
+                    json={"prompt": "Tennis at the Meadows tomorrow 4pm, need 2 players"},
+                    headers=auth_headers
+                )
+                assert response.status_code == 200
+                traveller.shift(30)
+        
+        assert len(groq_calls) == 1
+    
     def test_get_requests_unauthorized(self, client):
         """Test getting requests without auth returns empty list (public endpoint)."""
         response = client.get("/requests")
@@ -211,6 +440,145 @@ class TestGameRequestEndpoints:
         assert isinstance(response.json(), list)
 
 
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Stub call_llm with a fixed extraction response and a per-batch match responder.
+    
+    Returns an installer taking the extraction response string and a function from a batch's
+    game ids to the match response string; it returns the list of game ids sent per batch.
+    """
+    match_calls = []
+    
+    def install(extraction="{}", respond=lambda game_ids: "[]"):
+        async def fake_call_llm(system_message, user_message, temperature=0.7, max_tokens=1024, cache_if=None, cache_high_temperature=False):
+            if system_message.startswith(main._CREATE_SYSTEM_PROMPT):
+                return extraction
+            game_ids = re.findall(r"^game_id: (\S+)$", user_message, re.MULTILINE)
+            match_calls.append(game_ids)
+            return respond(game_ids)
+        
+        monkeypatch.setattr(main, "call_llm", fake_call_llm)
+        return match_calls
+    
+    return install
+
+
+def match_entry(game_id, is_match=True, score=90):
+    """Build one well-formed entry of the matching LLM's JSON array."""
+    return {"game_id": game_id, "is_match": is_match, "compatibility_score": score, "reason": "Same sport"}
+
+
+class TestFindMatch:
+    """Test LLM-backed matching with the LLM call stubbed out."""
+    
+    def test_find_match_returns_matches(self, client, seeded_game, fake_llm):
+        """Test that matching games are returned with their score."""
+        fake_llm(respond=lambda game_ids: json.dumps([match_entry("game-1")]))
+        response = client.post("/find-match", json={"prompt": "tennis tomorrow afternoon?"})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["game_request"]["id"] == seeded_game
+        assert data[0]["compatibility_score"] == 90
+    
+    async def test_find_match_batches_games_per_llm_call(self, client, seeded_game, fake_llm):
+        """Test that open games are scored in batches and mapped back by game_id."""
+        async with TestingSessionLocal() as db:
+            host = await db.scalar(select(User).where(User.username == "testuser"))
+            for i in range(11):
+                db.add(GameRequest(
+                    id=f"extra-{i}",
+                    host_id=host.id,
+                    original_prompt="Tennis at the Meadows tomorrow 4pm",
+                    sport="tennis",
+                    location="The Meadows",
+                    datetime_utc=datetime(2030, 1, 1, 16, 0),
+                    players_needed=2,
+                    status="open"
+                ))
+            await db.commit()
+        
+        match_calls = fake_llm(respond=lambda game_ids: json.dumps([
+            match_entry(game_id, is_match=game_id != "game-1", score=80) for game_id in game_ids
+        ]))
+        response = client.post("/find-match", json={"prompt": "tennis tomorrow afternoon?"})
+        
+        assert response.status_code == 200
+        assert sorted(len(ids) for ids in match_calls) == [2, 10]
+        assert {m["game_request"]["id"] for m in response.json()} == {f"extra-{i}" for i in range(11)}
+    
+    def test_find_match_prefilters_by_extracted_sport(self, client, seeded_game, fake_llm):
+        """Test that games of a different sport never reach the matching LLM."""
+        match_calls = fake_llm(
+            extraction=json.dumps({"sport": "football", "location": "unknown", "datetime_utc": "unknown", "players_needed": 0}),
+            respond=lambda game_ids: json.dumps([match_entry("game-1")])
+        )
+        response = client.post("/find-match", json={"prompt": "football anyone?"})
+        
+        assert response.status_code == 200
+        assert response.json() == []
+        assert match_calls == []
+    
+    async def test_find_match_skips_incomplete_entries(self, client, seeded_game, fake_llm):
+        """Test that an incomplete entry is skipped without losing the rest of its batch."""
+        async with TestingSessionLocal() as db:
+            game = await db.get(GameRequest, seeded_game)
+            db.add(GameRequest(
+                id="game-2",
+                host_id=game.host_id,
+                original_prompt=game.original_prompt,
+                sport=game.sport,
+                location=game.location,
+                datetime_utc=game.datetime_utc,
+                players_needed=game.players_needed,
+                status="open"
+            ))
+            await db.commit()
+        
+        incomplete = {"game_id": "game-1", "is_match": True, "compatibility_score": 90}
+        fake_llm(respond=lambda game_ids: json.dumps([incomplete, match_entry("game-2", score="high"), match_entry("game-2")]))
+        response = client.post("/find-match", json={"prompt": "tennis tomorrow afternoon?"})
+        
+        assert response.status_code == 200
+        assert [m["game_request"]["id"] for m in response.json()] == ["game-2"]
+    
+    def test_find_match_returns_each_game_once(self, client, seeded_game, fake_llm):
+        """Test that a game_id repeated in the LLM response is only matched once."""
+        fake_llm(respond=lambda game_ids: json.dumps([match_entry("game-1", score=90), match_entry("game-1", score=70)]))
+        response = client.post("/find-match", json={"prompt": "tennis tomorrow afternoon?"})
+        
+        assert response.status_code == 200
+        assert [(m["game_request"]["id"], m["compatibility_score"]) for m in response.json()] == [("game-1", 90)]
+    
+    def test_find_match_does_not_cache_malformed_batch(self, client, seeded_game, fake_groq):
+        """Test that a malformed batch response is retried on the next search, then cached once valid."""
+        batch_responses = iter(["not json", json.dumps([match_entry("game-1")])])
+        
+        def respond(messages):
+            if messages[0]["content"].startswith(main._CREATE_SYSTEM_PROMPT):
+                return "{}"
+            return next(batch_responses)
+        
+        groq_calls = fake_groq(respond)
+        results = [
+            client.post("/find-match", json={"prompt": "tennis tomorrow afternoon?"}).json()
+            for _ in range(3)
+        ]
+        
+        assert [[m["game_request"]["id"] for m in result] for result in results] == [[], ["game-1"], ["game-1"]]
+        match_calls = [call for call in groq_calls if call[0]["content"] == main._MATCH_SYSTEM_PROMPT]
+        assert len(match_calls) == 2
+    
+    def test_find_match_skips_malformed_llm_response(self, client, seeded_game, fake_llm):
+        """Test that malformed LLM responses are skipped rather than failing."""
+        fake_llm(extraction="not json", respond=lambda game_ids: "not json")
+        response = client.post("/find-match", json={"prompt": "tennis tomorrow afternoon?"})
+        
+        assert response.status_code == 200
+        assert response.json() == []
+
+
 class TestJoinRequestFlow:
     """Test join request workflow."""
     
@@ -219,6 +587,44 @@ class TestJoinRequestFlow:
         response = client.post("/games/game123/join", json={"description": "test"})
         
         assert response.status_code == 401
+    
+    def test_accepting_last_player_fills_game(self, client, auth_headers, seeded_game):
+        """Test joining a game and having the host accept fills the game."""
+        response = client.post(
+            "/auth/register",
+            json={"username": "joiner", "password": "joinpass"}
+        )
+        joiner_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        
+        response = client.post(
+            f"/games/{seeded_game}/join",
+            json={"game_id": seeded_game, "description": "Count me in"},
+            headers=joiner_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "pending"
+        
+        response = client.get(f"/games/{seeded_game}/join-requests", headers=auth_headers)
+        assert response.status_code == 200
+        pending = [jr for jr in response.json() if jr["username"] == "joiner"]
+        assert len(pending) == 1
+        
+        response = client.put(
+            f"/join-requests/{pending[0]['id']}",
+            json={"status": "accepted"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "accepted"
+        assert response.json()["username"] == "joiner"
+        
+        response = client.get("/my-games/hosted", headers=auth_headers)
+        assert response.json()[0]["players_joined"] == 2
+        assert response.json()[0]["status"] == "full"
+        
+        response = client.get("/my-games/joined", headers=joiner_headers)
+        assert len(response.json()) == 1
+        assert response.json()[0]["host_username"] == "testuser"
 
 
 class TestMyGamesEndpoints:
@@ -231,6 +637,15 @@ class TestMyGamesEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
     
+    def test_get_hosted_games_with_players(self, client, auth_headers, seeded_game):
+        """Test that hosted games include accepted player count."""
+        response = client.get("/my-games/hosted", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["players_joined"] == 1
+    
     def test_get_joined_games(self, client, auth_headers):
         """Test getting user's joined games."""
         response = client.get("/my-games/joined", headers=auth_headers)
@@ -238,13 +653,28 @@ class TestMyGamesEndpoints:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
     
-    def test_my_games_requires_auth(self, client):
+    async def test_my_games_views_agree(self, async_client, auth_headers, seeded_game):
+        """Test that the host's profile, hosted games and the public listing are consistent."""
+        me, hosted, joined, listing = await asyncio.gather(
+            async_client.get("/auth/me", headers=auth_headers),
+            async_client.get("/my-games/hosted", headers=auth_headers),
+            async_client.get("/my-games/joined", headers=auth_headers),
+            async_client.get("/requests")
+        )
+        
+        assert me.json()["username"] == "testuser"
+        assert [game["id"] for game in hosted.json()] == [seeded_game]
+        assert joined.json() == []
+        assert listing.json() == hosted.json()
+    
+    async def test_my_games_requires_auth(self, async_client):
         """Test that my games endpoints require auth."""
-        response = client.get("/my-games/hosted")
-        assert response.status_code == 401
+        responses = await asyncio.gather(
+            async_client.get("/my-games/hosted"),
+            async_client.get("/my-games/joined")
+        )
         
-        response = client.get("/my-games/joined")
-        assert response.status_code == 401
+        assert [response.status_code for response in responses] == [401, 401]
 
 
 class TestErrorHandling:
@@ -1,6 +1,9 @@
 """Unit tests for authentication functions."""
 import pytest
+import time
+import time_machine
 from datetime import timedelta, timezone, datetime
+import auth
 from auth import (
     verify_password,
     get_password_hash,
@@ -11,24 +14,29 @@ from auth import (
 )
 
 
+@pytest.fixture(scope="module")
+def hashed_password():
+    """Hash the canonical test password once per module."""
+    password = "test_password_123"
+    return password, get_password_hash(password)
+
+
 class TestPasswordHashing:
     """Test password hashing and verification."""
     
-    def test_password_hash_and_verify(self):
+    def test_password_hash_and_verify(self, hashed_password):
         """Test that password hashing and verification work correctly."""
-        password = "test_password_123"
-        hashed = get_password_hash(password)
+        password, hashed = hashed_password
         
         # Hash should not equal plain password
         assert hashed != password
         # Verification should succeed
         assert verify_password(password, hashed) is True
     
-    def test_wrong_password_fails_verification(self):
+    def test_wrong_password_fails_verification(self, hashed_password):
         """Test that wrong password fails verification."""
-        password = "correct_password"
+        _, hashed = hashed_password
         wrong_password = "wrong_password"
-        hashed = get_password_hash(password)
         
         assert verify_password(wrong_password, hashed) is False
     
@@ -63,6 +71,7 @@ class TestJWTTokens:
         assert decoded["user_id"] == 1
         assert "exp" in decoded
     
+    @time_machine.travel(datetime(2030, 1, 1, tzinfo=timezone.utc), tick=False)
     def test_token_with_custom_expiry(self):
         """Test creating token with custom expiration time."""
         data = {"sub": "testuser"}
@@ -72,13 +81,12 @@ class TestJWTTokens:
         decoded = decode_access_token(token)
         assert decoded is not None
         
-        # Check expiration is approximately 30 minutes from now
+        # The clock is frozen, so expiration is exactly 30 minutes from now
         exp_time = datetime.fromtimestamp(decoded["exp"], tz=timezone.utc)
         now = datetime.now(timezone.utc)
         time_diff = (exp_time - now).total_seconds()
         
-        # Should be close to 30 minutes (1800 seconds), allow 5 second margin
-        assert 1795 <= time_diff <= 1805
+        assert time_diff == 1800
     
     def test_decode_invalid_token(self):
         """Test that decoding invalid token returns None."""
@@ -97,6 +105,28 @@ class TestJWTTokens:
         decoded = decode_access_token(token)
         assert decoded is None
     
+    def test_cached_token_expires(self, monkeypatch):
+        """Test that a cached token is rejected once its expiry passes."""
+        data = {"sub": "testuser"}
+        token = create_access_token(data, timedelta(minutes=5))
+        assert decode_access_token(token) is not None
+        
+        future = time.time() + 600
+        monkeypatch.setattr(time, "time", lambda: future)
+        assert decode_access_token(token) is None
+    
+    def test_signing_key_is_reused(self, monkeypatch):
+        """Test that tokens are signed and verified without rebuilding the key."""
+        def fail_construct(*args, **kwargs):
+            raise AssertionError("JWT key rebuilt on a hot path")
+        
+        monkeypatch.setattr("jose.jws.jwk.construct", fail_construct)
+        signing_key = auth._signing_key
+        token = create_access_token({"sub": "testuser"})
+        
+        assert decode_access_token(token)["sub"] == "testuser"
+        assert auth._signing_key is signing_key
+    
     def test_token_contains_all_data(self):
         """Test that token preserves all provided data."""
         data = {
@@ -117,31 +147,14 @@ class TestJWTTokens:
 class TestAuthEdgeCases:
     """Test edge cases and error conditions."""
     
-    def test_empty_password_hash(self):
-        """Test hashing empty password."""
-        password = ""
-        hashed = get_password_hash(password)
-        
-        assert hashed != ""
-        assert verify_password(password, hashed) is True
-    
-    def test_very_long_password(self):
-        """Test hashing very long password."""
-        password = "a" * 1000
-        hashed = get_password_hash(password)
-        
-        assert verify_password(password, hashed) is True
-    
-    def test_special_characters_in_password(self):
-        """Test hashing password with special characters."""
-        password = "p@ssw0rd!#$%^&*()_+-=[]{}|;:',.<>?/~`"
-        hashed = get_password_hash(password)
-        
-        assert verify_password(password, hashed) is True
-    
-    def test_unicode_in_password(self):
-        """Test hashing password with unicode characters."""
-        password = "пароль密码🔒"
+    @pytest.mark.parametrize(
+        "password",
+        ["", "a" * 1000, "p@ssw0rd!#$%^&*()_+-=[]{}|;:',.<>?/~`", "пароль密码🔒"],
+        ids=["empty", "long", "special", "unicode"]
+    )
+    def test_password_roundtrip(self, password):
+        """Test hashing and verifying unusual passwords."""
         hashed = get_password_hash(password)
         
+        assert hashed != password
         assert verify_password(password, hashed) is True
@@ -0,0 +1,94 @@
+"""Unit tests for the LLM response cache."""
+import time
+from llm_cache import LLMCache
+
+
+def make_messages(user_message):
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": user_message}
+    ]
+
+
+class TestCacheKey:
+    """Test cache key generation."""
+    
+    def test_same_request_produces_same_key(self):
+        """Test that identical requests hash to the same key."""
+        cache = LLMCache()
+        key1 = cache.cache_key("model", make_messages("tennis tomorrow"), 0.3)
+        key2 = cache.cache_key("model", make_messages("tennis tomorrow"), 0.3)
+        
+        assert key1 is not None
+        assert key1 == key2
+    
+    def test_whitespace_and_case_are_normalized(self):
+        """Test that trivially different prompts share a key."""
+        cache = LLMCache()
+        key1 = cache.cache_key("model", make_messages("Tennis  tomorrow"), 0.3)
+        key2 = cache.cache_key("model", make_messages("tennis tomorrow "), 0.3)
+        
+        assert key1 == key2
+    
+    def test_different_requests_produce_different_keys(self):
+        """Test that model, prompt and temperature all affect the key."""
+        cache = LLMCache()
+        base = cache.cache_key("model", make_messages("tennis tomorrow"), 0.3)
+        
+        assert base != cache.cache_key("other-model", make_messages("tennis tomorrow"), 0.3)
+        assert base != cache.cache_key("model", make_messages("football tomorrow"), 0.3)
+        assert base != cache.cache_key("model", make_messages("tennis tomorrow"), 0.2)
+    
+    def test_high_temperature_is_not_cached(self):
+        """Test that calls above the temperature threshold get no key."""
+        cache = LLMCache(max_temperature=0.5)
+        
+        assert cache.cache_key("model", make_messages("tennis tomorrow"), 0.7) is None
+    
+    def test_high_temperature_can_opt_in(self):
+        """Test that a caller can explicitly cache a call above the threshold."""
+        cache = LLMCache()
+        
+        assert cache.cache_key("model", make_messages("tennis tomorrow"), 0.5) is None
+        assert cache.cache_key("model", make_messages("tennis tomorrow"), 0.5, allow_high_temperature=True) is not None
+
+
+class TestCacheStorage:
+    """Test cache get/set behaviour."""
+    
+    def test_set_and_get(self):
+        """Test that stored values are returned."""
+        cache = LLMCache()
+        cache.set("key", "value")
+        
+        assert cache.get("key") == "value"
+        assert cache.get("missing") is None
+    
+    def test_none_key_is_ignored(self):
+        """Test that uncacheable requests are never stored."""
+        cache = LLMCache()
+        cache.set(None, "value")
+        
+        assert cache.get(None) is None
+    
+    def test_expired_entry_is_dropped(self, monkeypatch):
+        """Test that entries expire after the TTL."""
+        cache = LLMCache(ttl=10)
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now)
+        cache.set("key", "value")
+        
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+        assert cache.get("key") is None
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache stays within maxsize."""
+        cache = LLMCache(maxsize=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"